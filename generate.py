@@ -1,5 +1,5 @@
 import sys
-from collections import deque
+from collections import Counter, defaultdict, deque
 from crossword import *
 
 
@@ -14,6 +14,39 @@ class CrosswordCreator():
             var: self.crossword.words.copy()
             for var in self.crossword.variables
         }
+        # Neighbors and their overlaps never change, so look them up once
+        self._neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self._overlaps = {
+            (x, y): self.crossword.overlaps[x, y]
+            for x in self.crossword.variables
+            for y in self._neighbors[x]
+        }
+        self._overlap_list = {
+            var: tuple((neighbor, *self._overlaps[var, neighbor]) for neighbor in self._neighbors[var])
+            for var in self.crossword.variables
+        }
+        # Failure weight of each constraint, bumped when it wipes out a domain
+        self.weights = defaultdict(lambda: 1)
+        # Letters found at each (variable, position) across its domain
+        self._letters_cache = {}
+        # Number the words of the right length for each variable, so a set of
+        # them is an int with one bit per word, and index those bitmasks by
+        # position and letter
+        self._words = {}
+        self._bits = {}
+        self.index = {}
+        for var in self.crossword.variables:
+            self._words[var] = [word for word in self.crossword.words if len(word) == var.length]
+            self._bits[var] = {word: 1 << bit for bit, word in enumerate(self._words[var])}
+            self.index[var] = [defaultdict(int) for _ in range(var.length)]
+            for word, bit in self._bits[var].items():
+                for position, letter in enumerate(word):
+                    self.index[var][position][letter] |= bit
+        # Bitmask of each variable's current domain
+        self._masks = {}
 
     def letter_grid(self, assignment):
         """
@@ -43,7 +76,7 @@ class CrosswordCreator():
         Enforce node and arc consistency, and then solve the CSP.
         """
         self.enforce_node_consistency()
-        arcs = [(x, y) for x in self.domains for y in self.crossword.neighbors(x)]
+        arcs = [(x, y) for x in self.domains for y in self._neighbors[x]]
         if not self.ac3(arcs):
             return None
         return self.backtrack(dict())
@@ -54,25 +87,73 @@ class CrosswordCreator():
         """
         for var in self.domains:
             self.domains[var] = {word for word in self.domains[var] if len(word) == var.length}
+            self._invalidate(var)
+
+    def _letters(self, var, position):
+        """
+        Return the set of letters that words in `var`'s domain have at
+        `position`, reusing the cached set while the domain is unchanged.
+        """
+        key = (var, position)
+        letters = self._letters_cache.get(key)
+        if letters is None:
+            letters = frozenset(word[position] for word in self.domains[var])
+            self._letters_cache[key] = letters
+        return letters
+
+    def _mask(self, var):
+        """
+        Return `var`'s domain as a bitmask over its numbered words, reusing
+        the cached mask while the domain is unchanged.
+        """
+        mask = self._masks.get(var)
+        if mask is None:
+            bits = self._bits[var]
+            mask = 0
+            for word in self.domains[var]:
+                mask |= bits.get(word, 0)
+            self._masks[var] = mask
+        return mask
+
+    def _invalidate(self, var):
+        """
+        Drop cached letter sets and domain mask for `var` after its domain
+        changed.
+        """
+        for position in range(var.length):
+            self._letters_cache.pop((var, position), None)
+        self._masks.pop(var, None)
 
     def revise(self, x, y):
         """
         Make `x` arc-consistent with `y` by removing values from `x`'s domain
         that have no corresponding value in `y`'s domain.
         """
-        if not self.crossword.overlaps[x, y]:
+        overlap = self._overlaps.get((x, y))
+        if not overlap:
             return False
 
-        i, j = self.crossword.overlaps[x, y]
-        letters_y = {w[j] for w in self.domains[y]}  # Use set for O(1) lookup
-        revised = False
+        i, j = overlap
+        letters_y = self._letters(y, j)
+        if self._letters(x, i) <= letters_y:
+            return False
 
-        words_to_remove = {word for word in self.domains[x] if word[i] not in letters_y}
-        if words_to_remove:
-            self.domains[x] -= words_to_remove
-            revised = True
-        
-        return revised
+        unsupported = 0
+        for letter in self._letters(x, i) - letters_y:
+            unsupported |= self.index[x][i][letter]
+        mask = self._mask(x)
+
+        # Collect the words behind the set bits of the removed mask
+        removed, words, removed_words = mask & unsupported, self._words[x], set()
+        while removed:
+            bit = removed & -removed
+            removed_words.add(words[bit.bit_length() - 1])
+            removed ^= bit
+
+        self.domains[x] = self.domains[x] - removed_words
+        self._invalidate(x)
+        self._masks[x] = mask & ~unsupported
+        return True
         
     def ac3(self, arcs=None):
         """
@@ -82,14 +163,15 @@ class CrosswordCreator():
             return True
         
         queue = deque(arcs if arcs is not None else [(x, y) 
-                                                     for x in self.domains for y in self.crossword.neighbors(x)])
+                                                     for x in self.domains for y in self._neighbors[x]])
         
         while queue:
             x, y = queue.popleft()
             if self.revise(x, y):
                 if not self.domains[x]:
+                    self.weights[frozenset((x, y))] += 1
                     return False
-                for z in self.crossword.neighbors(x) - {y}:
+                for z in self._neighbors[x] - {y}:
                     queue.append((z, x))
     
         return all(len(self.domains[var]) > 0 for var in self.domains)
@@ -111,29 +193,56 @@ class CrosswordCreator():
         for var, word in assignment.items():
             if len(word) != var.length:
                 return False
-            for neighbor in self.crossword.neighbors(var):
+            for neighbor in self._neighbors[var]:
                 if neighbor in assignment:
-                    i, j = self.crossword.overlaps[var, neighbor]
+                    i, j = self._overlaps[var, neighbor]
                     if word[i] != assignment[neighbor][j]:
                         return False
         return True
 
+    def _consistent_with(self, var, value, assignment):
+        """
+        Check if assigning `value` to `var` keeps an already consistent
+        `assignment` consistent.
+        """
+        if len(value) != var.length or value in assignment.values():
+            return False
+        for neighbor, i, j in self._overlap_list[var]:
+            if neighbor in assignment and value[i] != assignment[neighbor][j]:
+                return False
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Order domain values by least-constraining value heuristic.
         """
+        # A word rules out every neighbor word with a different letter at the
+        # overlap, so count each neighbor's letters once instead of per word
+        constraints = []
+        for neighbor in self._neighbors[var] - assignment.keys():
+            i, j = self._overlaps[var, neighbor]
+            counts = Counter(word[j] for word in self.domains[neighbor])
+            constraints.append((i, len(self.domains[neighbor]), counts))
+
         return sorted(self.domains[var], key=lambda word: sum(
-            word[self.crossword.overlaps[var, neighbor][0]] != neighbor_word[self.crossword.overlaps[var, neighbor][1]]
-            for neighbor in self.crossword.neighbors(var) - assignment.keys()
-            for neighbor_word in self.domains[neighbor]
+            size - counts[word[i]] for i, size, counts in constraints
         ))
 
     def select_unassigned_variable(self, assignment):
         """
-        Select an unassigned variable using MRV and degree heuristic.
+        Select an unassigned variable using the dom/wdeg heuristic: smallest
+        domain relative to the failure weight of its constraints with other
+        unassigned variables, with degree as tie-breaker.
         """
+        def dom_wdeg(var):
+            wdeg = sum(
+                self.weights[frozenset((var, neighbor))]
+                for neighbor in self._neighbors[var] if neighbor not in assignment
+            )
+            return (len(self.domains[var]) / (wdeg or 1), -len(self._neighbors[var]))
+
         unassigned = [var for var in self.crossword.variables if var not in assignment]
-        return min(unassigned, key=lambda var: (len(self.domains[var]), -len(self.crossword.neighbors(var))))
+        return min(unassigned, key=dom_wdeg)
 
     def backtrack(self, assignment):
         """
@@ -144,12 +253,27 @@ class CrosswordCreator():
 
         var = self.select_unassigned_variable(assignment)
         for value in self.order_domain_values(var, assignment):
-            assignment[var] = value
-            if self.consistent(assignment):
-                result = self.backtrack(assignment)
-                if result:
-                    return result
-            del assignment[var]
+            if self._consistent_with(var, value, assignment):
+                assignment[var] = value
+
+                # Maintain arc consistency; domains are replaced rather than
+                # mutated, so shallow copies are enough to restore them
+                saved_domains = dict(self.domains)
+                saved_letters = dict(self._letters_cache)
+                saved_masks = dict(self._masks)
+                self.domains[var] = {value}
+                self._invalidate(var)
+                arcs = [(neighbor, var) for neighbor in self._neighbors[var]
+                        if neighbor not in assignment]
+                if self.ac3(arcs):
+                    result = self.backtrack(assignment)
+                    if result:
+                        return result
+
+                self.domains = saved_domains
+                self._letters_cache = saved_letters
+                self._masks = saved_masks
+                del assignment[var]
         return None
 
 
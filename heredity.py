@@ -2,6 +2,8 @@ import csv
 import itertools
 import sys
 
+import numpy as np
+
 PROBS = {
     "gene": {2: 0.01, 1: 0.03, 0: 0.96},
     "trait": {
@@ -12,6 +14,9 @@ PROBS = {
     "mutation": 0.01,
 }
 
+# Probability of passing on the gene, indexed by the parent's gene count
+INHERIT_PROB = (PROBS["mutation"], 0.5, 1 - PROBS["mutation"])
+
 
 def main():
     if len(sys.argv) != 2:
@@ -26,19 +31,9 @@ def main():
         for person in people
     }
 
-    names = set(people)
-    for have_trait in powerset(names):
-        if any(
-            people[person]["trait"] is not None
-            and people[person]["trait"] != (person in have_trait)
-            for person in names
-        ):
-            continue
-
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    names = list(people)
+    for one_gene, two_genes, have_trait, p in joint_probabilities(people, names):
+        update_all(probabilities, names, one_gene, two_genes, have_trait, p)
 
     normalize(probabilities)
 
@@ -73,8 +68,7 @@ def powerset(s):
 
 
 def inherit_prob(parent, one_gene, two_genes):
-    parent_genes = 2 if parent in two_genes else 1 if parent in one_gene else 0
-    return {0: PROBS["mutation"], 1: 0.5, 2: 1 - PROBS["mutation"]}[parent_genes]
+    return INHERIT_PROB[2 if parent in two_genes else 1 if parent in one_gene else 0]
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -104,6 +98,72 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     return joint_prob
 
 
+def person_genes(one_gene, two_genes, idx):
+    # Gene count of person `idx` from membership bitmasks, where bit `idx`
+    # of `one_gene` / `two_genes` is set if that person has one / two genes
+    return ((two_genes >> idx) & 1) * 2 + ((one_gene >> idx) & 1)
+
+
+def joint_probabilities(people, names):
+    # Yield one entry per trait combination consistent with the observations,
+    # each covering every gene combination, encoded as bitmasks over `names`
+    n = len(names)
+
+    # Gene combinations are the base-3 numbers below 3^n, digit i being
+    # person i's gene count, so only disjoint (one, two) pairs are built
+    combos = np.arange(3 ** n)
+    one_gene = np.zeros_like(combos)
+    two_genes = np.zeros_like(combos)
+    for idx in range(n):
+        digit = combos // 3 ** idx % 3
+        one_gene |= (digit == 1).astype(combos.dtype) << idx
+        two_genes |= (digit == 2).astype(combos.dtype) << idx
+
+    # Drop trait combinations that contradict the observations in one pass
+    observed_mask = observed_value = 0
+    for idx, person in enumerate(names):
+        if people[person]["trait"] is not None:
+            observed_mask |= 1 << idx
+            observed_value |= people[person]["trait"] << idx
+
+    gene_prob = np.array([PROBS["gene"][g] for g in range(3)])
+    trait_prob = np.array([[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in range(3)])
+    inherit = np.array(INHERIT_PROB)
+    index = {person: idx for idx, person in enumerate(names)}
+
+    def parent_prob(parent):
+        if parent in index:
+            return inherit[person_genes(one_gene, two_genes, index[parent])]
+        return inherit[0]
+
+    # Per-person factors over the gene combinations, and per trait value, so
+    # only 3^n-long arrays are kept however many trait combinations there are
+    person_probs, trait_probs = [], []
+    for idx, person in enumerate(names):
+        genes = person_genes(one_gene, two_genes, idx)
+        mother, father = people[person]["mother"], people[person]["father"]
+
+        if not mother and not father:
+            person_probs.append(gene_prob[genes])
+        else:
+            mother_prob = parent_prob(mother)
+            father_prob = parent_prob(father)
+            person_probs.append(np.choose(genes, [
+                (1 - mother_prob) * (1 - father_prob),
+                (1 - mother_prob) * father_prob + (1 - father_prob) * mother_prob,
+                mother_prob * father_prob,
+            ]))
+        trait_probs.append((trait_prob[genes, 0], trait_prob[genes, 1]))
+
+    for have_trait in range(2 ** n):
+        if (have_trait ^ observed_value) & observed_mask:
+            continue
+        joint_prob = np.ones(len(combos))
+        for idx in range(n):
+            joint_prob *= person_probs[idx] * trait_probs[idx][(have_trait >> idx) & 1]
+        yield one_gene, two_genes, have_trait, joint_prob
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     for person in probabilities:
         person_genes = 2 if person in two_genes else 1 if person in one_gene else 0
@@ -112,6 +172,18 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
         probabilities[person]["trait"][person_trait] += p
 
 
+def update_all(probabilities, names, one_gene, two_genes, have_trait, p):
+    for idx, person in enumerate(names):
+        genes = person_genes(one_gene, two_genes, idx)
+        gene_totals = np.bincount(genes, weights=p, minlength=3)
+        has_trait = np.broadcast_to((have_trait >> idx) & 1, p.shape)
+        trait_totals = np.bincount(has_trait, weights=p, minlength=2)
+        for value in probabilities[person]["gene"]:
+            probabilities[person]["gene"][value] += float(gene_totals[value])
+        for value in probabilities[person]["trait"]:
+            probabilities[person]["trait"][value] += float(trait_totals[int(value)])
+
+
 def normalize(probabilities):
     for person in probabilities:
         for field in ["gene", "trait"]:
@@ -1,6 +1,7 @@
 import sys
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+import numpy as np
 import tensorflow as tf
 
 from PIL import Image, ImageDraw, ImageFont
@@ -12,8 +13,9 @@ MODEL = "bert-base-uncased"
 # Number of predictions to generate
 K = 3
 
-# Load tokenizer globally for efficiency
+# Load tokenizer and model globally for efficiency
 tokenizer = AutoTokenizer.from_pretrained(MODEL)
+model = TFBertForMaskedLM.from_pretrained(MODEL)
 
 # Constants for generating attention diagrams
 GRID_SIZE = 40
@@ -29,24 +31,32 @@ def main():
         sys.exit(f"Input must include mask token {tokenizer.mask_token}.")
 
     # Use model to process input
-    model = TFBertForMaskedLM.from_pretrained(MODEL)
-    result = model(**inputs, output_attentions=True)
+    logits, attentions = infer(inputs["input_ids"], inputs["attention_mask"])
 
     # Generate predictions
-    mask_token_logits = result.logits[0, mask_token_index]
+    mask_token_logits = logits[0, mask_token_index]
     top_tokens = tf.math.top_k(mask_token_logits, K).indices.numpy()
     for token in top_tokens:
         print(text.replace(tokenizer.mask_token, tokenizer.decode([token])))
 
     # Visualize attentions
-    visualize_attentions(inputs.tokens(), result.attentions)
+    visualize_attentions(inputs.tokens(), attentions)
+
+@tf.function(input_signature=[tf.TensorSpec([1, None], tf.int32)] * 2)
+def infer(input_ids, attention_mask):
+    """
+    Run the model as a compiled graph, returning logits and attentions. The
+    signature leaves the sequence length open, so the graph is traced once.
+    """
+    result = model(input_ids=input_ids, attention_mask=attention_mask, output_attentions=True)
+    return result.logits, result.attentions
 
 def get_mask_token_index(mask_token_id, inputs):
     """Efficiently retrieve index of [MASK] token."""
-    for i, token in enumerate(inputs.input_ids[0]):
-        if token == mask_token_id:
-            return i
-    return None
+    indices = tf.where(inputs.input_ids[0] == mask_token_id)
+    if tf.size(indices) == 0:
+        return None
+    return int(indices[0, 0])
 
 def get_color_for_attention_score(attention_score):
     """
@@ -62,19 +72,26 @@ def visualize_attentions(tokens, attentions):
     global PIXELS_PER_WORD
     PIXELS_PER_WORD = max(150, 400 // len(tokens))  # Scale dynamically
     
-    for i, layer in enumerate(attentions):
-        for k in range(len(layer[0])):  # Iterate through all attention heads
+    # Convert every score of every head to a gray level in one go
+    weights = np.stack([layer[0].numpy() for layer in attentions])  # (layers, heads, T, T)
+    grayscale = np.round(weights * 255).astype(np.uint8)
+
+    for i in range(grayscale.shape[0]):
+        for k in range(grayscale.shape[1]):  # Iterate through all attention heads
             layer_number = i + 1
             head_number = k + 1
             generate_diagram(
                 layer_number,
                 head_number,
                 tokens,
-                attentions[i][0][k]
+                grayscale[i, k]
             )
 
-def generate_diagram(layer_number, head_number, tokens, attention_weights):
-    """Generate a diagram representing the self-attention scores for a single attention head."""
+def generate_diagram(layer_number, head_number, tokens, grayscale):
+    """
+    Generate a diagram representing the self-attention scores for a single
+    attention head, given as a (T, T) array of gray levels.
+    """
     image_size = GRID_SIZE * len(tokens) + PIXELS_PER_WORD
     img = Image.new("RGBA", (image_size, image_size), "black")
     draw = ImageDraw.Draw(img)
@@ -96,13 +113,9 @@ def generate_diagram(layer_number, head_number, tokens, attention_weights):
             fill="white"
         )
 
-    # Draw attention scores
-    for i in range(len(tokens)):
-        y = PIXELS_PER_WORD + i * GRID_SIZE
-        for j in range(len(tokens)):
-            x = PIXELS_PER_WORD + j * GRID_SIZE
-            color = get_color_for_attention_score(attention_weights[i][j])
-            draw.rectangle((x, y, x + GRID_SIZE, y + GRID_SIZE), fill=color)
+    # Draw attention scores by scaling each score up to a GRID_SIZE square
+    heatmap = np.kron(grayscale, np.ones((GRID_SIZE, GRID_SIZE), dtype=np.uint8))
+    img.paste(Image.fromarray(heatmap, "L").convert("RGBA"), (PIXELS_PER_WORD, PIXELS_PER_WORD))
 
     # Save image
     img.save(f"Attention_Layer{layer_number}_Head{head_number}.png")
@@ -1,6 +1,7 @@
 
 import random
-import copy
+
+import numpy as np
 
 
 class Minesweeper:
@@ -16,20 +17,15 @@ class Minesweeper:
         self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = np.zeros((self.height, self.width), dtype=bool)
 
         # Add mines randomly
         while len(self.mines) != mines:
             i = random.randrange(height)
             j = random.randrange(width)
-            if not self.board[i][j]:
+            if not self.board[i, j]:
                 self.mines.add((i, j))
-                self.board[i][j] = True
+                self.board[i, j] = True
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -42,7 +38,7 @@ class Minesweeper:
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i, j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -51,7 +47,7 @@ class Minesweeper:
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -60,23 +56,11 @@ class Minesweeper:
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        # Sum the 3x3 block around the cell, clipped to the board,
+        # then leave out the cell itself
+        i, j = cell
+        nearby = self.board[max(0, i - 1):i + 2, max(0, j - 1):j + 2]
+        return int(nearby.sum()) - int(self.board[i, j])
 
     def won(self):
         """
@@ -123,7 +107,7 @@ class Sentence:
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells and self.count > 0:
+        if cell in self.cells:
             self.cells.remove(cell)
             self.count -= 1
 
@@ -132,7 +116,7 @@ class Sentence:
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells and self.count > 0:
+        if cell in self.cells:
             self.cells.remove(cell)
 
 
@@ -157,15 +141,17 @@ class MinesweeperAI:
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Cell sets of the sentences added so far, to skip duplicates
+        self._known = set()
+
+        # The set of cells on the board never changes
+        self._all_cells = frozenset((i, j) for i in range(height) for j in range(width))
+
     def _get_all_cells(self):
         """
         Returns a set of all cells on the board
         """
-        all_cells = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                all_cells.add((i, j))
-        return all_cells
+        return self._all_cells
 
     def _get_surrounding_cells(self, cell):
         """
@@ -228,8 +214,9 @@ class MinesweeperAI:
 
         # Create and add a new sentence
         new_sentence = Sentence(new_cells, count)
-        if new_sentence.cells:
+        if new_sentence.cells and frozenset(new_sentence.cells) not in self._known:
             self.knowledge.append(new_sentence)
+            self._known.add(frozenset(new_sentence.cells))
 
         # 4) Update knowledge with safes and mines
         self.update_knowledge()
@@ -267,62 +254,18 @@ class MinesweeperAI:
             # Remove empty sentences
             self.knowledge = [sentence for sentence in self.knowledge if sentence.cells]
 
-            # Infer new sentences from intersections of existing ones
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    if sentence1 == sentence2:
-                        continue
-
-                    intersection = sentence1.cells.intersection(sentence2.cells)
-                    if intersection:
-                        # Infer the non-overlapping parts
-                        diff1 = sentence1.cells - intersection
-                        diff2 = sentence2.cells - intersection
-                        new_count1 = sentence1.count - len(intersection)
-                        new_count2 = sentence2.count - len(intersection)
-
-                        # Add new sentences if meaningful
-                        if new_count1 >= 0 and diff1:
-                            inferred_sentence = Sentence(diff1, new_count1)
-                            if inferred_sentence not in self.knowledge:
-                                self.knowledge.append(inferred_sentence)
-                                changes = True
-
-                        if new_count2 >= 0 and diff2:
-                            inferred_sentence = Sentence(diff2, new_count2)
-                            if inferred_sentence not in self.knowledge:
-                                self.knowledge.append(inferred_sentence)
-                                changes = True
-
-
-    def _update_sentence(self, sentence):
-        """
-        Updates a given sentence with the knowledge about mines and safes.
-        """
-        # work with a copy to keep the original sentence
-        deepcopy_sentence = copy.deepcopy(sentence)
-        if deepcopy_sentence.count > 0 and len(sentence.cells) > 0:
-
-            # get rid of safes to identify mines
-            for safe in self.safes:
-                deepcopy_sentence.cells.remove(safe) if safe in deepcopy_sentence.cells else None
-                if len(deepcopy_sentence.cells) == deepcopy_sentence.count and len(deepcopy_sentence.cells) > 0:
-                    temp_set = set() # store mines temporarily in order to avoid KEYERROR
-                    for cell in deepcopy_sentence.cells:
-                        self.mines.add(cell)
-                        temp_set.add(cell)
-                    for cell in temp_set:
-                        deepcopy_sentence.cells.remove(cell)
-                        deepcopy_sentence.count -= 1
-
-            # get rid of mines to find safes
-            for mine in self.mines:
-                if mine in deepcopy_sentence.cells:
-                    deepcopy_sentence.cells.remove(mine)
-                    deepcopy_sentence.count -= 1
-                    if deepcopy_sentence.count == 0 and len(deepcopy_sentence.cells) > 0:
-                        for cell in deepcopy_sentence.cells:
-                            self.safes.add(cell)
+            # Infer new sentences with the subset rule: if sentence1's cells
+            # are a subset of sentence2's, the remaining cells of sentence2
+            # hold the difference in mine counts
+            by_size = sorted(self.knowledge, key=lambda sentence: len(sentence.cells))
+            for k, sentence1 in enumerate(by_size):
+                for sentence2 in by_size[k + 1:]:
+                    if len(sentence1.cells) < len(sentence2.cells) and sentence1.cells <= sentence2.cells:
+                        new_cells = frozenset(sentence2.cells - sentence1.cells)
+                        if new_cells not in self._known:
+                            self.knowledge.append(Sentence(new_cells, sentence2.count - sentence1.count))
+                            self._known.add(new_cells)
+                            changes = True
 
     def make_safe_move(self):
         """
@@ -333,15 +276,11 @@ class MinesweeperAI:
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        cells = self._get_all_cells()
-        save_moves = []
-        for cell in cells:
-            if cell not in self.moves_made and cell in self.safes:
-                save_moves.append(cell)
+        save_moves = self.safes - self.moves_made
         if len(save_moves) == 0:
             return None
         else:
-            return random.choice(save_moves)
+            return random.choice(list(save_moves))
 
     def make_random_move(self):
         """
@@ -352,12 +291,8 @@ class MinesweeperAI:
         """
         if self.make_safe_move() == None:
             # get all moves
-            cells = self._get_all_cells()
-            potential_moves = []
-            for cell in cells:
-                if cell not in self.moves_made and cell not in self.mines:
-                    potential_moves.append(cell)
+            potential_moves = self._get_all_cells() - self.moves_made - self.mines
             if len(potential_moves) == 0:
                 return None
             else:
-                return random.choice(potential_moves)
+                return random.choice(list(potential_moves))
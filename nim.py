@@ -1,5 +1,9 @@
+import math
+import multiprocessing
+import queue
 import random
-import time
+from collections import Counter, defaultdict
+from functools import lru_cache
 
 class Nim():
     def __init__(self, initial=[1, 3, 5, 7]):
@@ -7,6 +11,7 @@ class Nim():
         Initialize game board.
         """
         self.piles = initial.copy()
+        self.total = sum(self.piles)  # Objects left across all piles
         self.player = 0
         self.winner = None
 
@@ -15,7 +20,13 @@ class Nim():
         """
         Return all available actions (pile index, count) for the given state.
         """
-        return {(i, j) for i, pile in enumerate(piles) for j in range(1, pile + 1)}
+        return cls._available_actions(tuple(piles))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _available_actions(piles):
+        # Only a few thousand pile states are reachable, so cache them all
+        return frozenset((i, j) for i, pile in enumerate(piles) for j in range(1, pile + 1))
 
     @classmethod
     def other_player(cls, player):
@@ -35,54 +46,103 @@ class Nim():
             raise Exception("Invalid move")
         
         self.piles[pile] -= count
+        self.total -= count
         self.switch_player()
 
-        if all(p == 0 for p in self.piles):
+        if self.total == 0:
             self.winner = self.player
 
 
+def state_key(piles):
+    """
+    Pack a Nim state into a single int, 8 bits per pile, so piles must
+    hold fewer than 256 objects.
+    """
+    key = 0
+    for i, pile in enumerate(piles):
+        if pile > 255:
+            raise Exception("Piles must hold fewer than 256 objects")
+        key |= pile << (8 * i)
+    return key
+
+
+def action_key(action):
+    """
+    Pack a (pile, count) action into a single int, the pile index in the
+    low 8 bits, so there must be fewer than 256 piles.
+    """
+    pile, count = action
+    if pile > 255:
+        raise Exception("There must be fewer than 256 piles")
+    return pile | count << 8
+
+
+@lru_cache(maxsize=4096)
+def keyed_actions(piles):
+    """
+    Return the packed key of the state `piles` (a tuple) and its available
+    actions paired with their packed keys.
+    """
+    actions = tuple((action, action_key(action)) for action in Nim.available_actions(piles))
+    return state_key(piles), actions
+
+
 class NimAI():
-    def __init__(self, alpha=0.5, epsilon=0.1):
+    def __init__(self, alpha=0.5, epsilon=0.1, gamma=0.9):
         """
         Initialize AI with an empty Q-learning dictionary,
-        an adaptive learning rate (alpha), and an epsilon rate.
+        an adaptive learning rate (alpha), an epsilon rate,
+        and a discount factor (gamma) for end-of-game rewards.
         """
         self.q = dict()
         self.alpha = alpha  # Initial learning rate
         self.epsilon = epsilon
+        self.gamma = gamma
 
     def get_q_value(self, state, action):
         """ Return Q-value for the given (state, action) pair, default to 0. """
-        return self.q.get((tuple(state), action), 0)
+        return self.q.get((state_key(state), action_key(action)), 0)
 
     def update_q_value(self, state, action, old_q, reward, future_rewards):
         """
         Apply Q-learning formula to update the Q-value.
         """
         new_q = old_q + self.alpha * (reward + future_rewards - old_q)
-        self.q[(tuple(state), action)] = new_q
+        self.q[(state_key(state), action_key(action))] = new_q
 
     def best_future_reward(self, state):
         """
         Return the highest Q-value for any action in the given state.
         """
-        actions = Nim.available_actions(state)
-        return max((self.get_q_value(state, action) for action in actions), default=0)
+        return self._best_action(tuple(state))[1]
+
+    def _best_action(self, state):
+        """
+        Return the action with the highest Q-value in `state` together with
+        that Q-value, in a single pass, or (None, 0) if there are no actions.
+        """
+        key, actions = keyed_actions(state)
+        best_action, best_q = None, -math.inf
+        for action, packed_action in actions:
+            q = self.q.get((key, packed_action), 0)
+            if q > best_q:
+                best_action, best_q = action, q
+        if best_action is None:
+            return None, 0
+        return best_action, best_q
 
     def choose_action(self, state, epsilon=True):
         """
         Choose an action based on epsilon-greedy strategy.
         """
+        state = tuple(state)
         actions = list(Nim.available_actions(state))
         if not actions:
             return None
         
-        q_values = {action: self.get_q_value(state, action) for action in actions}
-        best_action = max(q_values, key=q_values.get)
-        
         if epsilon and random.random() < self.epsilon:
             return random.choice(actions)
-        return best_action
+        return self._best_action(state)[0]
 
     def update(self, old_state, action, new_state, reward):
         """
@@ -95,34 +155,125 @@ class NimAI():
         # Adaptive learning rate (decays over time)
         self.alpha = max(0.1, self.alpha * 0.99)
 
+    def update_episode(self, trajectory):
+        """
+        Update Q-values for a finished game in one backward sweep over its
+        (state key, action key) pairs, given in the order they were played.
+        The last move lost the game, so moves are rewarded -1 and 1
+        alternately from the end, discounted by gamma for every earlier
+        move of the same player.
+        """
+        for k, key in enumerate(reversed(trajectory)):
+            reward = (-1 if k % 2 == 0 else 1) * self.gamma ** (k // 2)
+            old_q = self.q.get(key, 0)
+            self.q[key] = old_q + self.alpha * (reward - old_q)
+
+            # Adaptive learning rate (decays over time)
+            self.alpha = max(0.1, self.alpha * 0.99)
+
+
+def self_play(player):
+    """
+    Play one game of `player` against itself and return the game's
+    (state key, action key) pairs in the order they were played.
+    """
+    game = Nim()
+    trajectory = []
+    while game.winner is None:
+        action = player.choose_action(game.piles)
+        trajectory.append((state_key(game.piles), action_key(action)))
+        game.move(action)
+    return trajectory
+
 
-def train(n):
+def train_worker(games, sync_every, tasks, results):
+    """
+    Play `games` training games in rounds of `sync_every`. Each round
+    starts from the shared Q-table received on `tasks` and ends by
+    sending the Q-values updated in that round, with the number of
+    updates to each, to `results`.
+    """
+    player = NimAI()
+    while games > 0:
+        player.q = tasks.get()
+        batch = min(sync_every, games)
+        visits = Counter()
+        for _ in range(batch):
+            trajectory = self_play(player)
+            player.update_episode(trajectory)
+            visits.update(trajectory)
+        results.put((batch, {key: (player.q[key], count) for key, count in visits.items()}))
+        games -= batch
+
+
+def receive(results, workers):
+    """
+    Return the next item from `results`, raising an exception instead of
+    waiting forever if a worker died.
+    """
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if any(worker.exitcode not in (None, 0) for worker in workers):
+                raise Exception("Training worker died")
+
+
+def train(n, num_workers=1, sync_every=1000):
     """
     Train an AI by playing `n` games against itself.
+
+    With more than one worker, games are split over `num_workers`
+    processes in rounds of `sync_every` games each. Every round starts
+    from the shared Q-table, and the values the workers updated are
+    merged back into it as averages weighted by how often each worker
+    updated them.
     """
+    if sync_every < 1:
+        raise Exception("sync_every must be at least 1")
+
     player = NimAI()
+    num_workers = min(num_workers, n)
 
-    for i in range(n):
-        print(f"Playing training game {i + 1}")
-        game = Nim()
-        last = {0: {"state": None, "action": None}, 1: {"state": None, "action": None}}
+    # Without fork, child processes would re-import the caller's script
+    if num_workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for i in range(n):
+            print(f"Playing training game {i + 1}")
+            player.update_episode(self_play(player))
+        print("Done training")
+        return player
 
-        while True:
-            state = game.piles.copy()
-            action = player.choose_action(game.piles)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    shares = [n // num_workers + (k < n % num_workers) for k in range(num_workers)]
+    tasks = [context.Queue() for _ in shares]
+    workers = [
+        context.Process(target=train_worker, args=(games, sync_every, task_queue, results), daemon=True)
+        for games, task_queue in zip(shares, tasks)
+    ]
+    for worker in workers:
+        worker.start()
 
-            last[game.player]["state"] = state
-            last[game.player]["action"] = action
+    played = 0
+    while played < n:
+        active = [k for k, games in enumerate(shares) if games > 0]
+        for k in active:
+            tasks[k].put(player.q)
+            shares[k] -= min(sync_every, shares[k])
 
-            game.move(action)
-            new_state = game.piles.copy()
+        totals = defaultdict(lambda: [0, 0])
+        for _ in active:
+            batch, updates = receive(results, workers)
+            for key, (q, count) in updates.items():
+                totals[key][0] += q * count
+                totals[key][1] += count
+            played += batch
+        for key, (weighted_q, count) in totals.items():
+            player.q[key] = weighted_q / count
+        print(f"Played {played} of {n} training games")
 
-            if game.winner is not None:
-                player.update(state, action, new_state, -1)
-                player.update(last[game.player]["state"], last[game.player]["action"], new_state, 1)
-                break
-            elif last[game.player]["state"] is not None:
-                player.update(last[game.player]["state"], last[game.player]["action"], new_state, 0)
+    for worker in workers:
+        worker.join()
 
     print("Done training")
     return player
@@ -143,7 +294,6 @@ def play(ai, human_player=None):
             print(f"Pile {i}: {pile}")
 
         available_actions = Nim.available_actions(game.piles)
-        time.sleep(1)
 
         if game.player == human_player:
             print("Your Turn")
@@ -1,13 +1,19 @@
 import os
-import random
 import re
 import sys
-import math
 import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+rng = np.random.default_rng()
+
+# Anchor tags and their href; a single \s keeps the whitespace after "<a"
+# from being matched two ways, which made long tags backtrack quadratically
+LINK_PATTERN = re.compile(r'<a\s[^>]*?href="([^"]*)"')
+
 
 def main():
     if len(sys.argv) != 2:
@@ -35,7 +41,7 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+            links = LINK_PATTERN.findall(contents)
             pages[filename] = set(links) - {filename}
     
     for filename in pages:
@@ -69,47 +75,86 @@ def sample_pagerank(corpus, damping_factor, n):
     according to transition model, starting with a page at random.
     """
     pagerank = {page: 0 for page in corpus}
-    sample = random.choice(list(corpus.keys()))  # Select initial page randomly
-    
-    for _ in range(n):
+    all_pages = list(corpus)
+    sample = all_pages[rng.integers(len(all_pages))]  # Select initial page randomly
+
+    # Follow one of the page's links with probability `damping_factor`,
+    # otherwise (or if it has none) jump to any page, as the transition
+    # model does, without building that model for every page
+    links = {page: tuple(corpus[page]) for page in corpus}
+
+    # Draw all the uniform numbers the walk needs in one call
+    follow = (rng.random(n) < damping_factor).tolist()
+    for draw, follow_link in zip(rng.random(n).tolist(), follow):
         pagerank[sample] += 1
-        probabilities = transition_model(corpus, sample, damping_factor)
-        pages, weights = zip(*probabilities.items())
-        sample = random.choices(pages, weights=weights, k=1)[0]
+        candidates = links[sample] if follow_link and links[sample] else all_pages
+        sample = candidates[int(draw * len(candidates))]
     
     total_samples = sum(pagerank.values())
     return {page: count / total_samples for page, count in pagerank.items()}
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, nstart=None, tol=1.0e-6, max_iter=100):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
+
+    Iteration starts from the uniform distribution, or from `nstart`, a
+    dictionary of non-negative starting values per page with a positive
+    total over the corpus, if given. It stops once the L1 norm of the
+    change between iterations is below `n * tol`, and raises an exception
+    if that takes more than `max_iter` iterations.
     """
-    n = len(corpus)
-    pagerank = {page: 1 / n for page in corpus}  # Initial equal probability
-    threshold = 0.001
-    
-    while True:
-        new_pagerank = {}
-        
-        for page in corpus:
-            rank_sum = sum(
-                pagerank[linking_page] / len(corpus[linking_page])
-                for linking_page in corpus if page in corpus[linking_page]
-            )
-            rank_sum += sum(
-                pagerank[no_link_page] / n for no_link_page in corpus if len(corpus[no_link_page]) == 0
-            )
-            new_pagerank[page] = (1 - damping_factor) / n + damping_factor * rank_sum
-        
+    pages = sorted(corpus)
+    index = {page: idx for idx, page in enumerate(pages)}
+    n = len(pages)
+
+    # Column-stochastic transition matrix: M[j, i] = 1 / outdeg(i) if i links
+    # to j. Its rows index each page's in-links, so a sweep is O(N + E)
+    outdegree = np.array([len(corpus[page]) for page in pages])
+    rows = np.array([index.get(link, -1) for page in pages for link in corpus[page]], dtype=int)
+    cols = np.repeat(np.arange(n), outdegree)
+    values = np.repeat(1 / np.maximum(outdegree, 1), outdegree)
+
+    # Links to pages outside the corpus still count towards outdeg(i), but
+    # lead nowhere
+    inside = rows >= 0
+    transitions = scipy.sparse.csr_matrix(
+        (values[inside], (rows[inside], cols[inside])), shape=(n, n)
+    )
+
+    # Gauss-Seidel: split I - d * M into its lower triangle, which uses the
+    # values already updated earlier in the same sweep, and the strictly
+    # upper triangle, which uses those from the previous sweep
+    system = (scipy.sparse.identity(n) - damping_factor * transitions).tocsr()
+    lower = scipy.sparse.linalg.splu(
+        scipy.sparse.tril(system, format="csc"), permc_spec="NATURAL", diag_pivot_thresh=0
+    )
+    upper = scipy.sparse.triu(system, k=1, format="csr")
+
+    # Pages without links spread their rank evenly over all pages
+    dangling = outdegree == 0
+
+    if nstart is None:
+        pagerank = np.full(n, 1 / n)  # Initial equal probability
+    else:
+        pagerank = np.array([nstart.get(page, 0) for page in pages], dtype=float)
+        if (pagerank < 0).any() or not pagerank.sum() > 0:
+            raise Exception("nstart must be non-negative with a positive total over the corpus")
+        pagerank /= pagerank.sum()
+
+    for _ in range(max_iter):
+        base = (1 - damping_factor + damping_factor * pagerank[dangling].sum()) / n
+        new_pagerank = lower.solve(base - upper.dot(pagerank))
+        new_pagerank /= new_pagerank.sum()
+
         # Check for convergence
-        if all(math.isclose(new_pagerank[p], pagerank[p], abs_tol=threshold) for p in pagerank):
-            break
-        
+        if np.abs(new_pagerank - pagerank).sum() < n * tol:
+            return {page: float(new_pagerank[idx]) for page, idx in index.items()}
+
         pagerank = new_pagerank
-    
-    return pagerank
+
+    raise Exception(f"PageRank did not converge in {max_iter} iterations")
 
 
 if __name__ == "__main__":
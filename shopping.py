@@ -30,25 +30,27 @@ def main():
 
 def load_data(filename):
     """
-    Load shopping data from a CSV file `filename` and convert into a list of
-    evidence lists and a list of labels. Return a tuple (evidence, labels).
+    Load shopping data from a CSV file `filename` and convert into an
+    evidence array (float32, one row per user) and a label array (int8).
+    Return a tuple (evidence, labels).
     """
-    # Define month mapping
-    abbr_to_num = {'Jan': 0, 'Feb': 1, 'Mar': 2, 'Apr': 3, 'May': 4, 'June': 5, 'Jul': 6,
-                   'Aug': 7, 'Sep': 8, 'Oct': 9, 'Nov': 10, 'Dec': 11}
+    # Months in order, so that their category codes run from 0 (Jan) to 11 (Dec)
+    months = pd.CategoricalDtype(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'Jul',
+                                  'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], ordered=True)
     
-    # Read data with pandas
-    df = pd.read_csv(filename)
+    # Read data with pandas, parsing categorical and boolean columns directly
+    df = pd.read_csv(filename, dtype={"Month": months, "VisitorType": "category",
+                                      "Weekend": "bool", "Revenue": "bool"})
     
     # Convert categorical values to integers
-    df["Month"]       = df["Month"].map(abbr_to_num)
+    df["Month"]       = df["Month"].cat.codes
     df["VisitorType"] = (df["VisitorType"] == "Returning_Visitor").astype(int)
-    df["Weekend"]     = (df["Weekend"] == "TRUE").astype(int)
-    df["Revenue"]     = (df["Revenue"] == "TRUE").astype(int)
+    df["Weekend"]     = df["Weekend"].astype(int)
+    df["Revenue"]     = df["Revenue"].astype(int)
     
     # Separate features and labels
-    evidence = df.iloc[:, :-1].values.tolist()
-    labels   = df.iloc[:, -1].values.tolist()
+    evidence = df.iloc[:, :-1].to_numpy(dtype=np.float32)
+    labels   = df.iloc[:, -1].to_numpy(dtype=np.int8)
     
     return evidence, labels
 
@@ -56,7 +58,7 @@ def train_model(evidence, labels):
     """
     Train a k-nearest neighbor classifier (k=1) on the training data.
     """
-    model = KNeighborsClassifier(n_neighbors=1)
+    model = KNeighborsClassifier(n_neighbors=1, algorithm="kd_tree", n_jobs=-1)
     model.fit(evidence, labels)
     return model
 
@@ -64,13 +66,13 @@ def evaluate(labels, predictions):
     """
     Calculate sensitivity and specificity of the model.
     """
-    labels = np.array(labels)
-    predictions = np.array(predictions)
+    labels = np.asarray(labels).astype(np.uint8)
+    predictions = np.asarray(predictions).astype(np.uint8)
     
-    true_positives = np.sum((labels == 1) & (predictions == 1))
-    false_negatives = np.sum((labels == 1) & (predictions == 0))
-    true_negatives = np.sum((labels == 0) & (predictions == 0))
-    false_positives = np.sum((labels == 0) & (predictions == 1))
+    # Count all four (label, prediction) outcomes in a single pass
+    true_negatives, false_positives, false_negatives, true_positives = np.bincount(
+        (labels << 1) | predictions, minlength=4
+    )
     
     sensitivity = true_positives / (true_positives + false_negatives) if (true_positives + false_negatives) > 0 else 0
     specificity = true_negatives / (true_negatives + false_positives) if (true_negatives + false_positives) > 0 else 0